@@ -6,8 +6,9 @@ import shutil
 import json
 from pathlib import Path
 from werkzeug.utils import secure_filename
+from werkzeug.security import safe_join
 from datetime import datetime
-from update_product_images import process_file_to_sql, load_config
+from update_product_images import process_file_to_sql, load_config, read_sql_page
 import glob
 import zipfile
 import io
@@ -144,7 +145,8 @@ def generate_sql():
                 for col in data.get('update_columns', [])
                 if 'db_column' in col and 'file_column' in col
             ],
-            'static_values': data.get('static_values', {}) or {}
+            'static_values': data.get('static_values', {}) or {},
+            'filters': data.get('filters', []) or []
         }
         
         # 驗證必要欄位
@@ -189,20 +191,49 @@ def generate_sql():
             batch_size=config['batch']['size']
         )
         
+        # 被拒絕與被篩選掉的資料資訊，錯誤時也一併回傳以便使用者下載拒絕檔
+        reject_file = result.get('reject_file')
+        reject_filename = os.path.basename(reject_file) if reject_file else None
+        row_details = {
+            'rejected_rows': result.get('rejected_count', 0),
+            'filtered_rows': result.get('filtered_count', 0),
+            'reject_file': reject_filename,
+            'reject_file_url': url_for('download_file', filename=reject_filename) if reject_filename else None
+        }
+        
+        if not result.get('success'):
+            return jsonify({
+                'error': result.get('error', 'Error processing file'),
+                **row_details
+            }), 400
+        
         # 獲取生成的 SQL 檔案
         output_files = sorted([f for f in os.listdir(app.config['OUTPUT_FOLDER']) 
                              if f.endswith('.sql')])
         
         if not output_files:
-            return jsonify({'error': 'No SQL files were generated. Please check your input file and configuration.'}), 400
+            error = 'No SQL files were generated. Please check your input file and configuration.'
+            if row_details['rejected_rows'] or row_details['filtered_rows']:
+                error = (
+                    f"No SQL files were generated: {row_details['rejected_rows']} rows rejected, "
+                    f"{row_details['filtered_rows']} rows filtered out."
+                )
+                if reject_filename:
+                    error += f" See {reject_filename} for the rejected rows."
+            return jsonify({'error': error, **row_details}), 400
         
-        # 儲存處理的資料筆數到 session
+        # 儲存處理的資料筆數與被拒絕的資料筆數到 session
         session['processed_rows'] = result.get('row_count', 0)
+        session['rejected_rows'] = row_details['rejected_rows']
+        session['filtered_rows'] = row_details['filtered_rows']
+        session['reject_file'] = reject_filename
         
         return jsonify({
             'success': True,
             'output_files': output_files,
-            'processed_rows': result.get('row_count', 0)
+            'processed_rows': result.get('row_count', 0),
+            'rejected_rows': result.get('rejected_count', 0),
+            'filtered_rows': result.get('filtered_count', 0)
         })
         
     except Exception as e:
@@ -221,12 +252,25 @@ def download_file(filename):
         as_attachment=True
     )
 
+# 預覽每頁語句數上限
+MAX_PREVIEW_PAGE_SIZE = 1000
+
 @app.route('/preview/<filename>')
 def preview_file(filename):
-    filepath = os.path.join(app.config['OUTPUT_FOLDER'], filename)
-    with open(filepath, 'r', encoding='utf-8') as f:
-        content = f.read()
-    return content
+    """分頁預覽 SQL 檔案，透過索引檔隨機存取，不會讀入整個檔案"""
+    filepath = safe_join(app.config['OUTPUT_FOLDER'], filename)
+    if filepath is None or not filename.endswith('.sql') or not os.path.isfile(filepath):
+        return jsonify({'error': f'File not found: {filename}'}), 404
+    
+    page = request.args.get('page', 1, type=int)
+    page_size = request.args.get('page_size', 100, type=int)
+    if page < 1 or page_size < 1:
+        return jsonify({'error': 'page and page_size must be positive integers'}), 400
+    page_size = min(page_size, MAX_PREVIEW_PAGE_SIZE)
+    
+    result = read_sql_page(filepath, page=page, page_size=page_size)
+    result['filename'] = filename
+    return jsonify(result)
 
 @app.route('/download_all')
 def download_all():
@@ -293,6 +337,9 @@ def result():
     
     # 從 session 中獲取處理的資料筆數
     total_rows = session.get('processed_rows', 0)
+    rejected_rows = session.get('rejected_rows', 0)
+    reject_file = session.get('reject_file')
+    filtered_rows = session.get('filtered_rows', 0)
     
     # 獲取檔案大小和行數（僅用於顯示）
     for file in os.listdir(app.config['OUTPUT_FOLDER']):
@@ -326,6 +373,9 @@ def result():
         'result.html',
         files=output_files,
         total_rows=total_rows,
+        rejected_rows=rejected_rows,
+        reject_file=reject_file,
+        filtered_rows=filtered_rows,
         file_count=len(output_files),
         summary=summary,
         output_dir=app.config['OUTPUT_FOLDER']
@@ -95,6 +95,9 @@
     }
 
     // --- SQL Preview Modal ---
+    const SQL_PREVIEW_PAGE_SIZE = 100;
+    let previewState = { filename: null, page: 1, totalPages: 1 };
+
     function initSQLPreview() {
         // 綁定預覽按鈕點擊事件
         document.addEventListener('click', function(e) {
@@ -127,6 +130,25 @@
             });
         }
 
+        // 綁定分頁按鈕點擊事件
+        const prevBtn = document.getElementById('sql-prev-page');
+        if (prevBtn) {
+            prevBtn.addEventListener('click', function() {
+                if (previewState.page > 1) {
+                    loadSQLPage(previewState.page - 1);
+                }
+            });
+        }
+
+        const nextBtn = document.getElementById('sql-next-page');
+        if (nextBtn) {
+            nextBtn.addEventListener('click', function() {
+                if (previewState.page < previewState.totalPages) {
+                    loadSQLPage(previewState.page + 1);
+                }
+            });
+        }
+
         // 綁定下載按鈕點擊事件
         const downloadBtn = document.getElementById('download-single');
         if (downloadBtn) {
@@ -150,9 +172,8 @@
         
         if (!sqlFilename || !sqlContent) return;
         
-        // 顯示載入中
         sqlFilename.textContent = filename;
-        sqlContent.textContent = '載入中...';
+        previewState = { filename: filename, page: 1, totalPages: 1 };
         
         // 設置下載連結
         if (downloadBtn) {
@@ -162,24 +183,65 @@
         // 顯示 Modal
         modal.show();
         
+        loadSQLPage(1);
+    }
+
+    // 載入指定頁的 SQL 語句
+    function loadSQLPage(page) {
+        const sqlContent = document.getElementById('sql-content');
+        const pageInfo = document.getElementById('sql-page-info');
+        const prevBtn = document.getElementById('sql-prev-page');
+        const nextBtn = document.getElementById('sql-next-page');
+        const filename = previewState.filename;
+        
+        if (!sqlContent || !filename) return;
+        
+        // 顯示載入中
+        sqlContent.textContent = '載入中...';
+        if (prevBtn) prevBtn.disabled = true;
+        if (nextBtn) nextBtn.disabled = true;
+        
         // 獲取 SQL 內容
-        fetch(`/preview/${filename}`)
+        fetch(`/preview/${encodeURIComponent(filename)}?page=${page}&page_size=${SQL_PREVIEW_PAGE_SIZE}`)
             .then(response => {
                 if (!response.ok) {
                     throw new Error('無法載入 SQL 內容');
                 }
-                return response.text();
+                return response.json();
             })
-            .then(content => {
-                sqlContent.textContent = content;
+            .then(data => {
+                // 使用者可能已切換到其他檔案
+                if (filename !== previewState.filename) return;
+                
+                previewState.page = data.page;
+                previewState.totalPages = data.total_pages;
+                
+                sqlContent.textContent = data.statements.join('\n');
+                if (pageInfo) {
+                    const last = data.first_statement + data.statements.length - 1;
+                    pageInfo.textContent = data.total_statements
+                        ? `第 ${data.page} / ${data.total_pages} 頁（第 ${data.first_statement}-${last} 筆，共 ${data.total_statements} 筆）`
+                        : '無 SQL 語句';
+                }
+                if (prevBtn) prevBtn.disabled = data.page <= 1;
+                if (nextBtn) nextBtn.disabled = data.page >= data.total_pages;
+                
                 // 重新高亮代碼
                 if (window.Prism) {
                     Prism.highlightElement(sqlContent);
                 }
             })
             .catch(error => {
+                // 使用者可能已切換到其他檔案
+                if (filename !== previewState.filename) return;
+
                 console.error('Error fetching SQL content:', error);
                 sqlContent.textContent = `載入 SQL 內容時出錯: ${error.message}`;
+
+                // 保留目前頁碼，讓使用者可以重試或切換頁面
+                if (pageInfo) pageInfo.textContent = '';
+                if (prevBtn) prevBtn.disabled = previewState.page <= 1;
+                if (nextBtn) nextBtn.disabled = previewState.page >= previewState.totalPages;
             });
     }
 
@@ -750,7 +812,11 @@
 
             if (!response.ok) {
                 const errorData = await response.json().catch(() => ({ message: '無法解析錯誤回應，請檢查網路連線或聯絡管理員。' }));
-                throw new Error(errorData.message || `伺服器錯誤: ${response.status}`);
+                let message = errorData.error || errorData.message || `伺服器錯誤: ${response.status}`;
+                if (errorData.reject_file_url) {
+                    message += ` <a href="${errorData.reject_file_url}" class="alert-link">下載拒絕檔</a>`;
+                }
+                throw new Error(message);
             }
 
             const result = await response.json();
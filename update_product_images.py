@@ -1,10 +1,126 @@
 import csv
 import os
+import re
+import struct
+import tempfile
 import yaml
 import argparse
 from typing import Dict, List, Any, Optional
 from pathlib import Path
 
+# Sidecar index written next to every SQL part: one little-endian uint64 byte
+# offset per UPDATE statement, so a page of statements can be located with a
+# single seek instead of reading the whole part.
+INDEX_SUFFIX = '.idx'
+_OFFSET = struct.Struct('<Q')
+
+# Accepted format for identifiers configured as numeric; ASCII digits only,
+# since full-width or other Unicode digits would be written unquoted
+_NUMERIC_RE = re.compile(r'[+-]?(\d+(\.\d*)?|\.\d+)([eE][+-]?\d+)?', re.ASCII)
+
+
+def _encoded_length(text: str) -> int:
+    """Number of bytes ``text`` occupies once written through a text-mode file."""
+    return len(text.encode('utf-8')) + text.count('\n') * (len(os.linesep) - 1)
+
+
+def build_sql_index(sql_path: str) -> str:
+    """
+    (Re)build the statement offset index for an existing SQL part.
+
+    Used for parts generated before the index existed or changed since. The
+    file is scanned line by line, so memory use does not depend on the file
+    size. The index is written to a temporary file and moved into place, so
+    concurrent readers never see a partially written index.
+
+    Args:
+        sql_path: Path to the generated .sql file
+
+    Returns:
+        str: Path of the written index file
+    """
+    index_path = str(sql_path) + INDEX_SUFFIX
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(index_path) or '.',
+        prefix=os.path.basename(index_path) + '.',
+        suffix='.tmp'
+    )
+    try:
+        with open(sql_path, 'rb') as sql_file, os.fdopen(fd, 'wb') as index_file:
+            offset = 0
+            for line in sql_file:
+                if line.startswith(b'UPDATE '):
+                    index_file.write(_OFFSET.pack(offset))
+                offset += len(line)
+        os.replace(temp_path, index_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return index_path
+
+
+def read_sql_page(sql_path: str, page: int = 1, page_size: int = 100) -> Dict[str, Any]:
+    """
+    Read one page of statements from a generated SQL part using its index.
+
+    Only the index entries for the requested page and the byte range they
+    cover are read, so each call uses constant memory regardless of the
+    part size.
+
+    Args:
+        sql_path: Path to the generated .sql file
+        page: 1-based page number
+        page_size: Number of statements per page
+
+    Returns:
+        Dict containing the page statements and paging information
+    """
+    if page < 1:
+        raise ValueError("page must be >= 1")
+    if page_size < 1:
+        raise ValueError("page_size must be >= 1")
+
+    # Rebuild a missing index, or one older than the SQL file it describes
+    index_path = str(sql_path) + INDEX_SUFFIX
+    if (not os.path.exists(index_path)
+            or os.path.getmtime(index_path) < os.path.getmtime(sql_path)):
+        build_sql_index(sql_path)
+
+    total = os.path.getsize(index_path) // _OFFSET.size
+    total_pages = max(1, -(-total // page_size))
+    first = (page - 1) * page_size
+    count = max(0, min(page_size, total - first))
+
+    statements = []
+    if count:
+        with open(index_path, 'rb') as index_file:
+            index_file.seek(first * _OFFSET.size)
+            # Read one extra entry (when present) to know where the last
+            # statement of the page ends.
+            raw = index_file.read((count + 1) * _OFFSET.size)
+        offsets = [value for (value,) in _OFFSET.iter_unpack(raw)]
+        if len(offsets) == count:
+            offsets.append(os.path.getsize(sql_path))
+
+        with open(sql_path, 'rb') as sql_file:
+            sql_file.seek(offsets[0])
+            chunk = sql_file.read(offsets[-1] - offsets[0])
+
+        base = offsets[0]
+        for start, end in zip(offsets, offsets[1:]):
+            statement = chunk[start - base:end - base].decode('utf-8').strip()
+            statements.append(statement)
+
+    return {
+        'page': page,
+        'page_size': page_size,
+        'total_statements': total,
+        'total_pages': total_pages,
+        'first_statement': first + 1 if count else 0,
+        'statements': statements
+    }
+
 def load_config(config_file: str) -> Dict[str, Any]:
     """Load and validate configuration from YAML file."""
     with open(config_file, 'r', encoding='utf-8') as f:
@@ -67,90 +183,238 @@ def escape_sql_value(value: Any, is_numeric: bool = False) -> str:
     # Return the escaped string
     return f"'{escaped_value}'"
 
-def generate_update_sql(row: Dict[str, str], config: Dict[str, Any]) -> Optional[str]:
+# Factories turning a filter's configured value into a predicate on the
+# stripped cell value; values are validated as strings beforehand
+_FILTER_OPERATORS = {
+    'eq': lambda value: value.__eq__,
+    'ne': lambda value: value.__ne__,
+    'in': lambda values: frozenset(values).__contains__,
+    'not_in': lambda values: (lambda s, f=frozenset(values): s not in f),
+    'contains': lambda value: (lambda s: value in s),
+    'startswith': lambda value: (lambda s: s.startswith(value)),
+    'endswith': lambda value: (lambda s: s.endswith(value)),
+    'regex': lambda value: re.compile(value).search,
+}
+
+def compile_filters(filters: List[Dict[str, Any]], fieldnames: List[str]) -> List[Any]:
+    """
+    Compile the configured row filters into predicates.
+
+    Args:
+        filters: Filter definitions with 'column', 'op' (default 'eq') and a
+            string 'value' (a list of strings for 'in' and 'not_in')
+        fieldnames: Column names of the input file
+
+    Returns:
+        List of (column, predicate) tuples; a row is kept only if every
+        predicate returns True for its stripped column value
+
+    Raises:
+        ValueError: If a filter is incomplete, uses an unknown operator, has
+            a non-string value or references a column missing from the input
+    """
+    available = set(fieldnames or [])
+    compiled = []
+    for filter_def in filters or []:
+        col_name = filter_def.get('column', '')
+        op = str(filter_def.get('op', 'eq')).lower()
+        if not col_name or 'value' not in filter_def:
+            raise ValueError(f"Filter requires 'column' and 'value': {filter_def}")
+
+        if op not in _FILTER_OPERATORS:
+            raise ValueError(
+                f"Unknown filter operator '{op}', expected one of: {', '.join(_FILTER_OPERATORS)}"
+            )
+
+        if col_name not in available:
+            raise ValueError(f"Missing filter column '{col_name}' in input data")
+
+        value = filter_def['value']
+        if op in ('in', 'not_in') and not isinstance(value, (list, tuple)):
+            value = [value]
+
+        # YAML turns unquoted values such as true, 0123 or 1.10 into other
+        # types, which would never match the raw cell text
+        for item in (value if op in ('in', 'not_in') else [value]):
+            if not isinstance(item, str):
+                raise ValueError(
+                    f"Filter value for column '{col_name}' must be a string, got "
+                    f"{type(item).__name__} {item!r}; quote the value in the config, "
+                    f"e.g. value: \"0123\""
+                )
+
+        compiled.append((col_name, _FILTER_OPERATORS[op](value)))
+
+    return compiled
+
+def resolve_schema(fieldnames: List[str], config: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Resolve the configured columns against the input header once.
+
+    Configuration problems are reported here a single time instead of on
+    every row. Missing identifier columns are fatal, missing update columns
+    are dropped from the statement with one warning. Row filters are
+    compiled here as well.
+
+    Args:
+        fieldnames: Column names of the input file
+        config: Configuration dictionary
+
+    Returns:
+        Dict describing the identifier columns, update columns, row filters
+        and the pre-rendered parts of the UPDATE statement
+
+    Raises:
+        ValueError: If no usable WHERE or SET clause can be built
+    """
+    available = set(fieldnames or [])
+
+    identifiers = []
+    missing_identifiers = []
+    for id_field in config.get('identifiers', []):
+        col_name = id_field.get('column', '')
+        if not col_name:
+            print("Warning: Missing column name in identifier configuration")
+            continue
+
+        if col_name not in available:
+            missing_identifiers.append(col_name)
+            continue
+
+        # Determine if the value should be treated as numeric
+        is_numeric = id_field.get('is_numeric', False)
+        if 'data_type' in id_field and id_field['data_type'] == 'number':
+            is_numeric = True
+
+        identifiers.append((id_field.get('name', col_name), col_name, bool(is_numeric)))
+
+    if missing_identifiers:
+        raise ValueError(
+            f"Missing identifier column(s) in input data: {', '.join(missing_identifiers)}"
+        )
+
+    if not identifiers:
+        raise ValueError("No valid identifiers found for WHERE clause")
+
+    update_columns = []
+    for col in config.get('update_columns', []):
+        col_name = col.get('column', '')
+        if not col_name:
+            print("Warning: Missing column name in update columns configuration")
+            continue
+
+        if col_name not in available:
+            print(f"Warning: Missing update column '{col_name}' in input data, it will be skipped")
+            continue
+
+        # Determine if the value should be treated as numeric
+        is_numeric = False
+        if 'data_type' in col:
+            is_numeric = col['data_type'] == 'number'
+        elif 'is_numeric' in col:
+            is_numeric = bool(col['is_numeric'])
+
+        update_columns.append((col.get('name', col_name), col_name, is_numeric))
+
+    # Static values are the same for every row, render them once
+    static_parts = []
+    static_values = config.get('static_values', {})
+    if isinstance(static_values, dict):
+        for key, value in static_values.items():
+            if value is not None and str(value).strip() != '':
+                # Check if the value is a function like NOW()
+                if isinstance(value, str) and value.endswith('()'):
+                    static_parts.append(f"{key} = {value}")
+                else:
+                    # Escape the value properly
+                    escaped_value = escape_sql_value(value, False)
+                    static_parts.append(f"{key} = {escaped_value}")
+
+    if not update_columns and not static_parts:
+        raise ValueError("No valid columns to update")
+
+    # Get database and table names with defaults
+    db_name = config.get('database', {}).get('name', 'mms')
+    table_name = config.get('database', {}).get('table', 'PRODUCT_IMAGES')
+
+    return {
+        'identifiers': identifiers,
+        'update_columns': update_columns,
+        'static_parts': static_parts,
+        'filters': compile_filters(config.get('filters', []), fieldnames),
+        'table': f"{db_name}.{table_name}"
+    }
+
+def validate_row(row: Dict[str, Any], schema: Dict[str, Any]) -> Optional[str]:
+    """
+    Check a row against a resolved schema.
+
+    Args:
+        row: Dictionary containing row data
+        schema: Schema returned by resolve_schema
+
+    Returns:
+        str: Reason the row is rejected, or None if the row is valid
+    """
+    for _, col_name, is_numeric in schema['identifiers']:
+        value = row.get(col_name)
+        if value is None:
+            return f"Missing value for identifier '{col_name}' (too few fields)"
+
+        value = value.strip()
+        if not value:
+            return f"Empty identifier '{col_name}'"
+
+        if is_numeric and not _NUMERIC_RE.fullmatch(value):
+            return f"Non-numeric value for identifier '{col_name}': {value}"
+
+    for _, col_name, _ in schema['update_columns']:
+        if row.get(col_name) is None:
+            return f"Missing value for column '{col_name}' (too few fields)"
+
+    return None
+
+def generate_update_sql(
+    row: Dict[str, str],
+    config: Dict[str, Any],
+    schema: Optional[Dict[str, Any]] = None
+) -> Optional[str]:
     """
     Generate a single UPDATE SQL statement.
     
     Args:
         row: Dictionary containing row data
         config: Configuration dictionary
+        schema: Schema returned by resolve_schema; resolved from the row
+            keys when not given
         
     Returns:
         str: Generated SQL statement or None if there was an error
     """
     try:
-        # Build WHERE clause
-        where_parts = []
-        for id_field in config.get('identifiers', []):
-            col_name = id_field.get('column', '')
-            if not col_name:
-                print("Warning: Missing column name in identifier configuration")
-                continue
-                
-            if col_name not in row:
-                print(f"Warning: Missing identifier column '{col_name}' in input data")
+        if schema is None:
+            try:
+                schema = resolve_schema(list(row.keys()), config)
+            except ValueError as e:
+                print(f"Warning: {str(e)}")
                 return None
-            
-            # Determine if the value should be treated as numeric
-            is_numeric = id_field.get('is_numeric', False)
-            if 'data_type' in id_field and id_field['data_type'] == 'number':
-                is_numeric = True
-                
-            value = escape_sql_value(row[col_name], is_numeric)
-            where_parts.append(f"{id_field.get('name', col_name)} = {value}")
-        
-        if not where_parts:
-            print("Error: No valid identifiers found for WHERE clause")
-            return None
+
+        # Build WHERE clause
+        where_parts = [
+            f"{name} = {escape_sql_value(row[col_name], is_numeric)}"
+            for name, col_name, is_numeric in schema['identifiers']
+        ]
         
         # Build SET clause
-        set_parts = []
-        
-        # Add dynamic columns from the input file
-        for col in config.get('update_columns', []):
-            col_name = col.get('column', '')
-            if not col_name:
-                print("Warning: Missing column name in update columns configuration")
-                continue
-                
-            if col_name not in row:
-                print(f"Warning: Missing update column '{col_name}' in input data")
-                continue
-                
-            # Determine if the value should be treated as numeric
-            is_numeric = False
-            if 'data_type' in col:
-                is_numeric = col['data_type'] == 'number'
-            elif 'is_numeric' in col:
-                is_numeric = bool(col['is_numeric'])
-                
-            value = escape_sql_value(row[col_name], is_numeric)
-            set_parts.append(f"{col.get('name', col_name)} = {value}")
-        
-        # Add static values
-        static_values = config.get('static_values', {})
-        if isinstance(static_values, dict):
-            for key, value in static_values.items():
-                if value is not None and str(value).strip() != '':
-                    # Check if the value is a function like NOW()
-                    if isinstance(value, str) and value.endswith('()'):
-                        set_parts.append(f"{key} = {value}")
-                    else:
-                        # Escape the value properly
-                        escaped_value = escape_sql_value(value, False)
-                        set_parts.append(f"{key} = {escaped_value}")
-        
-        if not set_parts:
-            print("Warning: No valid columns to update")
-            return None
-        
-        # Get database and table names with defaults
-        db_name = config.get('database', {}).get('name', 'mms')
-        table_name = config.get('database', {}).get('table', 'PRODUCT_IMAGES')
+        set_parts = [
+            f"{name} = {escape_sql_value(row[col_name], is_numeric)}"
+            for name, col_name, is_numeric in schema['update_columns']
+        ]
+        set_parts.extend(schema['static_parts'])
         
         # Build the complete SQL statement
         sql = (
-            f"UPDATE {db_name}.{table_name} "
+            f"UPDATE {schema['table']} "
             f"SET {', '.join(set_parts)} "
             f"WHERE {' AND '.join(where_parts)};"
         )
@@ -167,16 +431,25 @@ def process_file_to_sql(
     input_file: str,
     config: Dict[str, Any],
     output_dir: str = 'output',
-    batch_size: Optional[int] = None
+    batch_size: Optional[int] = None,
+    max_errors: Optional[int] = None
 ) -> Dict[str, Any]:
     """
     Process input file and generate SQL UPDATE statements in batches.
     
+    Rows not matching the configured filters are skipped before any
+    validation or formatting. Rows that fail validation are written to a
+    reject TSV together with their line number and the reason, instead of
+    being dropped. If the run fails or is aborted, the SQL parts it wrote
+    are removed.
+    
     Args:
         input_file: Path to the input file (TSV/CSV)
         config: Configuration dictionary
         output_dir: Directory to save SQL files
         batch_size: Number of rows per output file
+        max_errors: Abort once more rows than this have been rejected
+            (None or 0 means no limit)
         
     Returns:
         Dict containing processing results
@@ -190,19 +463,60 @@ def process_file_to_sql(
     
     # Initialize variables
     row_count = 0
+    rejected_count = 0
+    filtered_count = 0
     file_count = 1
     output_file = None
+    index_file = None
+    reject_file = None
+    reject_writer = None
+    offset = 0
     output_files = []
     
     # Get batch size from config if not provided
     if batch_size is None:
         batch_size = config.get('batch', {}).get('size', 10000)
     
+    # Get reject settings from config if not provided
+    reject_config = config.get('rejects', {}) or {}
+    if max_errors is None:
+        max_errors = reject_config.get('max_errors')
+    reject_path = Path(reject_config.get('file') or output_dir / f"{base_filename}_rejects.tsv")
+    
     # Determine the file format and delimiter
     input_config = config.get('input', {})
     delimiter = '\t' if input_config.get('format', '').lower() == 'tsv' else ','
+    db_name = config.get('database', {}).get('name', 'mms')
+    
+    def result_dict(**extra):
+        result = {
+            'row_count': row_count,
+            'rejected_count': rejected_count,
+            'filtered_count': filtered_count,
+            'reject_file': str(reject_path.absolute()) if reject_writer else None,
+            'file_count': len(output_files),
+            'output_files': output_files,
+            'output_dir': str(output_dir.absolute())
+        }
+        result.update(extra)
+        return result
     
     try:
+        # Remove a reject file left by a previous run; it is only recreated
+        # when this run rejects a row
+        if reject_path.exists():
+            reject_path.unlink()
+        
+        # YAML may give the threshold as a string, e.g. max_errors: "1000"
+        if max_errors is not None:
+            try:
+                converted = int(max_errors)
+            except (TypeError, ValueError):
+                converted = None
+            if converted is None or isinstance(max_errors, bool):
+                raise ValueError(f"rejects.max_errors must be an integer, got {max_errors!r}")
+            max_errors = converted
+        
         with open(input_file, 'r', encoding='utf-8') as f:
             # Read the input file
             reader = csv.DictReader(
@@ -211,60 +525,110 @@ def process_file_to_sql(
                 fieldnames=None if input_config.get('has_header', True) else [col['column'] for col in config.get('update_columns', [])]
             )
             
+            # Validate the configuration against the header once
+            fieldnames = reader.fieldnames
+            if not fieldnames:
+                raise ValueError("Input file is empty or has no header row")
+            schema = resolve_schema(fieldnames, config)
+            filters = schema['filters']
+            
             for row in reader:
                 # Skip empty rows
                 if not any(row.values()):
                     continue
+                
+                # Skip rows not matching the filters; a missing field (short
+                # row) is left to validate_row so it ends up in the reject file
+                if filters and not all(
+                    row[col_name] is None or predicate(row[col_name].strip())
+                    for col_name, predicate in filters
+                ):
+                    filtered_count += 1
+                    continue
+                
+                reason = validate_row(row, schema)
+                sql = None if reason else generate_update_sql(row, config, schema)
+                if not sql:
+                    if reject_writer is None:
+                        reject_path.parent.mkdir(parents=True, exist_ok=True)
+                        reject_file = open(reject_path, 'w', encoding='utf-8', newline='')
+                        reject_writer = csv.writer(reject_file, delimiter='\t')
+                        reject_writer.writerow(['line', 'reason'] + list(fieldnames))
+                    reject_writer.writerow(
+                        [reader.line_num, reason or 'Failed to generate SQL']
+                        + [row.get(name) or '' for name in fieldnames]
+                    )
+                    rejected_count += 1
+                    
+                    if max_errors and rejected_count > max_errors:
+                        raise ValueError(
+                            f"Aborted at line {reader.line_num}: more than {max_errors} rows rejected"
+                        )
+                    continue
                     
                 # Create new output file if needed
                 if row_count % batch_size == 0:
                     if output_file:
                         output_file.close()
+                        index_file.close()
                     
                     output_filename = f"{base_filename}_part_{file_count:03d}.sql"
                     output_path = output_dir / output_filename
                     output_file = open(output_path, 'w', encoding='utf-8')
+                    index_file = open(str(output_path) + INDEX_SUFFIX, 'wb')
                     output_files.append(output_path.name)
                     
                     # Add USE statement at the beginning of each file
-                    db_name = config.get('database', {}).get('name', 'mms')
-                    output_file.write(f'USE {db_name};\n\n')
+                    header = f'USE {db_name};\n\n'
+                    output_file.write(header)
+                    offset = _encoded_length(header)
                     file_count += 1
                 
-                # Generate and write the SQL statement
-                sql = generate_update_sql(row, config)
-                if sql:
-                    output_file.write(sql + '\n')
-                    row_count += 1
-                    
-                    # Add a newline between statements for better readability
-                    if (row_count % 100) == 0:
-                        output_file.write('\n')
+                # Write the SQL statement
+                index_file.write(_OFFSET.pack(offset))
+                line = sql + '\n'
+                output_file.write(line)
+                offset += _encoded_length(line)
+                row_count += 1
+                
+                # Add a newline between statements for better readability
+                if (row_count % 100) == 0:
+                    output_file.write('\n')
+                    offset += _encoded_length('\n')
         
-        result = {
-            'success': True,
-            'row_count': row_count,
-            'file_count': len(output_files),
-            'output_files': output_files,
-            'output_dir': str(output_dir.absolute())
-        }
+        result = result_dict(success=True)
         print(f"Processed {row_count} rows. Output files saved to: {output_dir.absolute()}")
+        if filtered_count:
+            print(f"Filtered out {filtered_count} rows.")
+        if rejected_count:
+            print(f"Rejected {rejected_count} rows. Details saved to: {reject_path.absolute()}")
         return result
         
     except Exception as e:
         error_msg = f"Error processing file: {str(e)}"
         print(error_msg)
-        return {
-            'success': False,
-            'error': error_msg,
-            'row_count': row_count,
-            'file_count': len(output_files),
-            'output_files': output_files,
-            'output_dir': str(output_dir.absolute())
-        }
+        
+        # Remove the parts written by this run so a partial batch can't be
+        # executed by mistake; the reject file is kept for diagnosis
+        if output_file and not output_file.closed:
+            output_file.close()
+        if index_file and not index_file.closed:
+            index_file.close()
+        for name in output_files:
+            for path in (output_dir / name, output_dir / (name + INDEX_SUFFIX)):
+                if path.exists():
+                    path.unlink()
+        output_files = []
+        row_count = 0
+        
+        return result_dict(success=False, error=error_msg)
     finally:
         if output_file and not output_file.closed:
             output_file.close()
+        if index_file and not index_file.closed:
+            index_file.close()
+        if reject_file and not reject_file.closed:
+            reject_file.close()
 
 
 
@@ -287,6 +651,10 @@ def main():
                       type=int, 
                       default=None, 
                       help='Number of rows per output file (overrides config if specified)')
+    parser.add_argument('--max-errors', 
+                      type=int, 
+                      default=None, 
+                      help='Abort after this many rejected rows (overrides config if specified)')
     
     args = parser.parse_args()
     
@@ -324,14 +692,15 @@ def main():
     
     try:
         # Process the file
-        process_file_to_sql(
+        result = process_file_to_sql(
             input_file=input_file,
             config=config,
             output_dir=output_dir,
-            batch_size=args.batch_size
+            batch_size=args.batch_size,
+            max_errors=args.max_errors
         )
         
-        return 0
+        return 0 if result['success'] else 1
         
     except Exception as e:
         print(f"Error: {str(e)}")